@@ -3,14 +3,17 @@ from __future__ import annotations
 import json as _json
 import typing as t
 
+import orjson
+
 from .provider import _default
 
+# dates are passed through to `_default` to keep Flask's HTTP date format
+_DUMPS_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
 
-def dumps(obj: t.Any, **kwargs: t.Any) -> str:
-    """Serialize data as JSON."""
 
-    kwargs.setdefault("default", _default)
-    return _json.dumps(obj, **kwargs)
+def dumps(obj: t.Any) -> str:
+    """Serialize data as compact JSON."""
+    return orjson.dumps(obj, default=_default, option=_DUMPS_OPTIONS).decode()
 
 
 def loads(s: str | bytes, **kwargs: t.Any) -> t.Any:
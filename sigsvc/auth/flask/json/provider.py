@@ -1,24 +1,20 @@
 from __future__ import annotations
 
-import dataclasses
 import decimal
 import typing as t
-import uuid
 from datetime import date
 
 from werkzeug.http import http_date
 
 
 def _default(o: t.Any) -> t.Any:
+    # UUIDs and dataclasses are serialized by orjson natively
     if isinstance(o, date):
         return http_date(o)
 
-    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+    if isinstance(o, decimal.Decimal):
         return str(o)
 
-    if dataclasses and dataclasses.is_dataclass(o):
-        return dataclasses.asdict(o)  # type:ignore[arg-type]
-
     if hasattr(o, "__html__"):
         return str(o.__html__())
 
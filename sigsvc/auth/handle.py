@@ -1,9 +1,14 @@
+import asyncio
+import functools
 import hashlib
+import hmac
 import http
 import logging as log
 import os
+import ssl
+import time
 import typing as t
-from http.cookies import SimpleCookie
+from dataclasses import dataclass
 
 from itsdangerous import (
     BadSignature,
@@ -13,60 +18,170 @@ from websockets import Headers
 from websockets.legacy.server import HTTPResponse
 
 from sigsvc.auth.flask.json.tag import TaggedJSONSerializer
+from sigsvc.biz.cookie import find_cookies
 
-# pylint: disable=logging-fstring-interpolation
 AUTH_TOKEN_COOKIE_NAME = "sigsvc_authtoken"  # nosec B105:hardcoded_password_string
+WS_CONN_ID_COOKIE_NAME = "sigsvc_wsconnid"
 FLASK_SECRET_KEY = os.environ.get("FLASK_SECRET_KEY")  # SECRET_KEY
 FLASK_SESSION_COOKIE_NAME = "session"  # SESSION_COOKIE_NAME
 FLASK_SESSION_LIFETIME = int(os.environ.get("FLASK_PERMANENT_SESSION_LIFETIME", 2678400))  # PERMANENT_SESSION_LIFETIME
 # values from https://github.com/pallets/flask/blob/708d62d7172a30c5b0ace1d212c5a3bc2b53b98c/src/flask/sessions.py#L277
 FLASK_SIGN_SALT = "cookie-session"
-FLASK_SIGN_KEY_DERIVATION = "hmac"
-FLASK_SIGN_DIGEST_METHOD = staticmethod(hashlib.sha1)
+# must match SecureCookieSessionInterface.digest_method of the flask app, cookies signed otherwise won't verify
+# (a plain function, not a staticmethod as in flask: hmac only takes OpenSSL's fast path for the former)
+FLASK_SIGN_DIGEST = os.environ.get("FLASK_SIGN_DIGEST", "sha1")
+# shake_* need an explicit digest length, they can't be used with hmac
+FLASK_SIGN_DIGESTS = frozenset(a for a in hashlib.algorithms_guaranteed if not a.startswith("shake_"))
+if FLASK_SIGN_DIGEST not in FLASK_SIGN_DIGESTS:
+    raise ValueError(
+        f"FLASK_SIGN_DIGEST: unsupported digest {FLASK_SIGN_DIGEST!r}, expected one of: {sorted(FLASK_SIGN_DIGESTS)}"
+    )
+FLASK_SIGN_DIGEST_METHOD = getattr(hashlib, FLASK_SIGN_DIGEST)
 
 AUTH_TOKEN = os.environ.get("AUTH_TOKEN")
 DEBUG_NO_AUTH = os.environ.get("DEBUG_NO_AUTH", "false").lower() == "true"
 
+AUTH_COOKIE_NAMES = frozenset((AUTH_TOKEN_COOKIE_NAME, FLASK_SESSION_COOKIE_NAME, WS_CONN_ID_COOKIE_NAME))
+
+SESSION_CACHE_MAX_SIZE = 4096
+SESSION_CACHE_TTL = 300  # seconds
+
+# validated session cookies: blake2b(cookie) -> (user_id, expires_at in time.monotonic() terms)
+_session_cache: t.Dict[bytes, tuple[int, float]] = {}
+
+
+@dataclass
+class AuthContext:
+    """Credentials extracted from the handshake cookies by auth(), handed over to the connection handler."""
+
+    authenticated: bool = False
+    ws_conn_id: t.Optional[str] = None  # sticky-session cookie
+    user_id: t.Optional[int] = None  # only for consumer (UA) connections, comes from the flask session cookie
+
 
+def log_digest_backend() -> None:
+    """Session cookies are HMAC-verified on every consumer handshake, make sure it runs on OpenSSL's implementation
+    (SHA-NI accelerated on CPUs supporting it) rather than on the builtin fallback one."""
+    digest_method = FLASK_SIGN_DIGEST_METHOD
+    if digest_method.__name__.startswith("openssl_"):
+        log.info("session cookie digest: %s (%s)", digest_method().name, ssl.OPENSSL_VERSION)
+    else:
+        log.warning("session cookie digest: %s is not backed by OpenSSL, expect slow handshakes", digest_method().name)
+
+
+@functools.lru_cache(maxsize=1)
 def get_flask_signing_serializer() -> URLSafeTimedSerializer:
-    signer_kwargs = {"key_derivation": FLASK_SIGN_KEY_DERIVATION, "digest_method": FLASK_SIGN_DIGEST_METHOD}
+    """Serializer doesn't depend on the cookie being verified, so it's built once and shared.
+
+    itsdangerous creates a new signer and derives the signing key from the secret on every loads(), so the key is
+    derived here once, the way flask's signer does it (key_derivation="hmac"), and handed over as is.
+    """
+    if FLASK_SECRET_KEY is None:
+        raise TypeError("FLASK_SECRET_KEY is not set")
+    signing_key = hmac.new(
+        FLASK_SECRET_KEY.encode(), FLASK_SIGN_SALT.encode(), digestmod=FLASK_SIGN_DIGEST_METHOD
+    ).digest()
+    signer_kwargs = {"key_derivation": "none", "digest_method": FLASK_SIGN_DIGEST_METHOD}
     return URLSafeTimedSerializer(
-        FLASK_SECRET_KEY,
+        signing_key,
         salt=FLASK_SIGN_SALT,
         serializer=TaggedJSONSerializer(),
         signer_kwargs=signer_kwargs,
     )
 
 
+def _cache_key(session_cookie: str) -> bytes:
+    return hashlib.blake2b(session_cookie.encode(), digest_size=16).digest()
+
+
+def _cached_user_id(key: bytes) -> t.Optional[int]:
+    cached = _session_cache.get(key)
+    if cached is None:
+        return None
+    if time.monotonic() < cached[1]:
+        return cached[0]
+    del _session_cache[key]  # expired: the cookie has to be verified again
+    return None
+
+
+def _verify_session_cookie(session_cookie: str) -> tuple[int, float]:
+    """Yields user_id and for how long (in seconds) it may be cached.
+
+    Doesn't touch the cache, so it's safe to run in a worker thread.
+    """
+    data, signed_at = get_flask_signing_serializer().loads(
+        session_cookie, max_age=FLASK_SESSION_LIFETIME, return_timestamp=True
+    )
+    # cached entry should never outlive the cookie itself
+    return int(data["_user_id"]), min(SESSION_CACHE_TTL, signed_at.timestamp() + FLASK_SESSION_LIFETIME - time.time())
+
+
+def _store_user_id(key: bytes, user_id: int, ttl: float) -> None:
+    # re-inserted, so the oldest entries are always the first ones to be evicted
+    _session_cache.pop(key, None)
+    if len(_session_cache) >= SESSION_CACHE_MAX_SIZE:
+        del _session_cache[next(iter(_session_cache))]
+    _session_cache[key] = (user_id, time.monotonic() + ttl)
+
+
 def get_user_id(session_cookie: str) -> int:
-    s = get_flask_signing_serializer()
-    data = s.loads(session_cookie, max_age=FLASK_SESSION_LIFETIME)
-    return int(data["_user_id"])
+    """Verify flask session cookie and extract user_id from it.
+
+    Results are cached for a short time, so UAs reconnecting with the same cookie skip the HMAC check and payload
+    decoding. Cookies are stored hashed, so raw tokens are not retained in memory.
+    """
+    key = _cache_key(session_cookie)
+    cached = _cached_user_id(key)
+    if cached is not None:
+        return cached
+    user_id, ttl = _verify_session_cookie(session_cookie)
+    _store_user_id(key, user_id, ttl)
+    return user_id
 
 
-async def auth(request_headers: Headers) -> t.Optional[HTTPResponse]:
+async def get_user_id_async(session_cookie: str) -> int:
+    """Same as get_user_id(), but cache misses are verified in the default executor, so a reconnect storm doesn't
+    stall the event loop (and the peers already connected) on HMAC checks and payload decoding."""
+    key = _cache_key(session_cookie)
+    cached = _cached_user_id(key)
+    if cached is not None:
+        return cached
+    user_id, ttl = await asyncio.get_running_loop().run_in_executor(None, _verify_session_cookie, session_cookie)
+    _store_user_id(key, user_id, ttl)
+    return user_id
+
+
+async def auth(request_headers: Headers, ctx: t.Optional[AuthContext] = None) -> t.Optional[HTTPResponse]:
     """
     Perform authentication and yield None upon successful authentication,
     or else provide an HTTPResponse (UNAUTHORIZED) to interrupt the initial handshake.
+
+    Upon successful authentication, `ctx` (if provided) is filled with the credentials found in the cookies, so they
+    don't have to be parsed and verified once again when the connection is established.
     """
     if DEBUG_NO_AUTH:
         return None
     if "cookie" in request_headers:
-        raw_cookie = request_headers["cookie"]
-        cookie = SimpleCookie()
-        cookie.load(raw_cookie)
+        cookie = find_cookies(request_headers["cookie"], AUTH_COOKIE_NAMES)
+        if ctx is not None:
+            ctx.ws_conn_id = cookie.get(WS_CONN_ID_COOKIE_NAME)
         if AUTH_TOKEN_COOKIE_NAME in cookie:
-            auth_token = cookie[AUTH_TOKEN_COOKIE_NAME].value
+            auth_token = cookie[AUTH_TOKEN_COOKIE_NAME]
             if auth_token == AUTH_TOKEN:
                 log.debug("successfully authenticated service (streamd?)")
+                if ctx is not None:
+                    ctx.authenticated = True
                 return None
             else:
                 return http.HTTPStatus.UNAUTHORIZED, [], b"Invalid auth token\n"
         elif FLASK_SESSION_COOKIE_NAME in cookie:
-            session_cookie = cookie[FLASK_SESSION_COOKIE_NAME].value
+            session_cookie = cookie[FLASK_SESSION_COOKIE_NAME]
             try:
-                user_id = get_user_id(session_cookie)
-                log.debug(f"successfully authenticated user (user_id: {user_id})")
+                user_id = await get_user_id_async(session_cookie)
+                log.debug("successfully authenticated user (user_id: %s)", user_id)
+                if ctx is not None:
+                    ctx.authenticated = True
+                    ctx.user_id = user_id
                 return None
             except BadSignature:
                 return http.HTTPStatus.UNAUTHORIZED, [], b"Invalid auth token\n"
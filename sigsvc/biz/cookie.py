@@ -0,0 +1,40 @@
+from http.cookies import (
+    CookieError,
+    SimpleCookie,
+)
+
+
+def _fallback_simplecookie(raw: str, names: frozenset[str]) -> dict[str, str]:
+    res: dict[str, str] = {}
+    # parsed cookie by cookie, as SimpleCookie lets the last duplicate win
+    for part in raw.split(";"):
+        cookie: SimpleCookie = SimpleCookie()
+        try:
+            cookie.load(part)
+        except CookieError:
+            return {}
+        for name in names & cookie.keys():
+            res.setdefault(name, cookie[name].value)
+    return res
+
+
+def find_cookies(raw: str, names: frozenset[str]) -> dict[str, str]:
+    """Extract only the requested cookies from the raw `Cookie` header value.
+
+    SimpleCookie parses and wraps every cookie found in the header (UAs usually send dozens of third-party ones),
+    while we only need a couple of them on every handshake.
+    If a cookie is sent more than once (e.g. set for both the parent domain and a subdomain), the first one wins, as
+    UAs send the most specific (longest path) cookies first.
+    """
+    if "\\" in raw:
+        # escaped (quoted) values, let the stdlib parser deal with them
+        return _fallback_simplecookie(raw, names)
+    res: dict[str, str] = {}
+    for part in raw.split(";"):
+        k, _, v = part.partition("=")
+        k = k.strip()
+        if k in names and k not in res:
+            res[k] = v.strip().strip('"')
+            if len(res) == len(names):
+                break
+    return res
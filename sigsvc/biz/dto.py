@@ -1,9 +1,13 @@
+import dataclasses
+import functools
 import typing as t
 from dataclasses import field
 from enum import StrEnum
 
+import marshmallow_dataclass
+import orjson
 from marshmallow import Schema
-from marshmallow_dataclass import dataclass
+from marshmallow_dataclass import add_schema
 
 from sigsvc.biz.errors import UnknownPeerException
 from sigsvc.services.dto.sessionsvc import SessionDC
@@ -11,7 +15,53 @@ from sigsvc.services.dto.sessionsvc import SessionDC
 # pylint: disable=invalid-name
 
 
-@dataclass
+class OrjsonRenderModule:
+    """JSON `render_module` for marshmallow schemas backed by orjson.
+
+    marshmallow expects `dumps()` to return str, so orjson's bytes output is decoded.
+    """
+
+    @staticmethod
+    def dumps(obj: t.Any, *args: t.Any, **kwargs: t.Any) -> str:  # pylint: disable=unused-argument
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(s: str | bytes, *args: t.Any, **kwargs: t.Any) -> t.Any:  # pylint: disable=unused-argument
+        return orjson.loads(s)
+
+
+class BaseSchema(Schema):
+    """Base schema for all signaling DTOs: (de)serializes JSON messages with orjson instead of stdlib json."""
+
+    class Meta:
+        render_module = OrjsonRenderModule
+
+
+_T = t.TypeVar("_T")
+
+
+@t.dataclass_transform(field_specifiers=(field,))
+def dataclass(cls: t.Type[_T]) -> t.Type[_T]:
+    """`marshmallow_dataclass.dataclass` replacement producing slotted dataclasses.
+
+    DTOs are created for every inbound and outbound message, slots drop the per-instance `__dict__` and make attribute
+    access cheaper.
+    """
+    return add_schema(dataclasses.dataclass(slots=True)(cls), base_schema=BaseSchema, stacklevel=2)
+
+
+@functools.cache
+def get_schema(dto_cls: t.Type[t.Any]) -> Schema:
+    """Returns a shared Schema instance of the DTO class.
+
+    Schema construction is expensive (fields are copied and bound on every instantiation), while its instances are
+    stateless and can be reused for any number of load/dump calls.
+    """
+    return dto_cls.Schema()
+
+
+# not slotted: SessionDC (mirrored from sessionsvc) keeps its fields in __dict__, see from_sessiondc()
+@marshmallow_dataclass.dataclass(base_schema=BaseSchema)
 class Session(SessionDC):
     ending: bool = False
 
@@ -25,16 +75,11 @@ class Session(SessionDC):
 
     @classmethod
     def from_sessiondc(cls, sessiondc: SessionDC) -> t.Self:
-        # pylint: disable=unexpected-keyword-arg
-        return cls(
-            id=sessiondc.id,
-            app_release_uuid=sessiondc.app_release_uuid,
-            container=sessiondc.container,
-            status=sessiondc.status,
-            updated=sessiondc.updated,
-            user_id=sessiondc.user_id,
-            ws_conn=sessiondc.ws_conn,
-        )
+        # shallow copy of the (already validated) sessiondc fields, no __init__ arguments marshalling
+        session = cls.__new__(cls)
+        session.__dict__.update(sessiondc.__dict__)
+        session.ending = False
+        return session
 
 
 class RequestType(StrEnum):
@@ -144,6 +189,18 @@ class SubmitWebRtcStatsRequestDTO(BaseRequestDTO):
     Schema: t.ClassVar[t.Type[Schema]] = Schema  # pylint: disable=invalid-name
 
 
+# inbound message `type` -> schema of its DTO, compiled once at import time. `list` and `getSessions` carry no payload
+# and `peer` messages are relayed as is (they contain dynamic attributes), so those are not loaded into DTOs at all.
+REQUEST_SCHEMAS: dict[RequestType, Schema] = {
+    RequestType.SET_PEER_STATUS: get_schema(SetPeerStatusRequestDTO),
+    RequestType.CREATE_SESSION: get_schema(CreateSessionRequestDTO),
+    RequestType.START_SESSION: get_schema(StartSessionRequestDTO),
+    RequestType.END_SESSION: get_schema(EndSessionRequestDTO),
+    RequestType.GET_SESSION: get_schema(GetSessionRequestDTO),
+    RequestType.SUBMIT_WEBRTC_STATS: get_schema(SubmitWebRtcStatsRequestDTO),
+}
+
+
 # we call "responses" messages which are sent back to the original requester peer
 class ResponseType(StrEnum):
     UNKNOWN = "unknown"
@@ -240,3 +297,29 @@ class GetSessionResponseDTO(BaseResponseDTO):
 
     session: Session
     Schema: t.ClassVar[t.Type[Schema]] = Schema  # pylint: disable=invalid-name
+
+
+# Fixed-shape responses sent on every handshake or session change are rendered from templates, skipping the schema
+# dump. Output is the same as get_schema(DTO).dumps(DTO(...)).
+WELCOME_RESPONSE_TMPL = '{"type":"%s","peerId":"%%s"}' % ResponseType.WELCOME  # peer ids are UUIDs, no escaping
+SESSION_ENDED_RESPONSE_TMPL = '{"type":"%s","session_id":%%s}' % ResponseType.SESSION_ENDED
+SESSION_CREATED_RESPONSE_TMPL = '{"type":"%s","session_id":%%s}' % ResponseType.SESSION_CREATED
+ERROR_RESPONSE_TMPL = '{"type":"%s","code":%%d,"message":%%s}' % ResponseType.ERROR
+EMPTY_LIST_RESPONSE = get_schema(ListResponseDTO).dumps(ListResponseDTO(producers=[]))
+
+
+def welcome_response(peer_id: str) -> str:
+    return WELCOME_RESPONSE_TMPL % peer_id
+
+
+def session_ended_response(session_id: str) -> str:
+    return SESSION_ENDED_RESPONSE_TMPL % orjson.dumps(session_id).decode()
+
+
+def session_created_response(session_id: str) -> str:
+    return SESSION_CREATED_RESPONSE_TMPL % orjson.dumps(session_id).decode()
+
+
+def error_response(code: int, message: t.Any) -> str:
+    # messages aren't always str (e.g. sessionsvc error payloads), the schema renders them through str() as well
+    return ERROR_RESPONSE_TMPL % (code, orjson.dumps(message if message is None else str(message)).decode())
@@ -9,6 +9,9 @@ ERROR_UNKNOWN_PEER = (1404, "unknown peer")
 
 
 class BizException(Exception):
+    # raised on every malformed signaling message: slots spare the per-instance __dict__
+    __slots__ = ("code", "message")
+
     def __init__(self, code: int, message: t.Any) -> None:
         self.code = code
         self.message = message
@@ -16,6 +19,8 @@ class BizException(Exception):
 
 
 class SigsvcOpException(BizException):
+    __slots__ = ()
+
     def __init__(self, message: t.Optional[t.Any]) -> None:
         code = ERROR_SIGSVC_OP[0]
         message = message or ERROR_SIGSVC_OP[1]
@@ -23,6 +28,8 @@ class SigsvcOpException(BizException):
 
 
 class SessionsQuotaLimitExceededException(BizException):
+    __slots__ = ()
+
     def __init__(self) -> None:
         code = ERROR_SESSIONS_QUOTA_LIMIT_EXCEEDED[0]
         message = ERROR_SESSIONS_QUOTA_LIMIT_EXCEEDED[1]
@@ -30,6 +37,8 @@ class SessionsQuotaLimitExceededException(BizException):
 
 
 class UnknownPeerException(BizException):
+    __slots__ = ()
+
     def __init__(self, message: t.Optional[t.Any] = None) -> None:
         code = ERROR_UNKNOWN_PEER[0]
         message = message or ERROR_UNKNOWN_PEER[1]
@@ -37,6 +46,8 @@ class UnknownPeerException(BizException):
 
 
 class RequestValidationException(BizException):
+    __slots__ = ()
+
     def __init__(self, message: t.Optional[t.Any] = None) -> None:
         code = ERROR_REQUEST_VALIDATION[0]
         message = message or ERROR_REQUEST_VALIDATION[1]
@@ -44,6 +55,8 @@ class RequestValidationException(BizException):
 
 
 class SessionSvcException(BizException):
+    __slots__ = ()
+
     def __init__(self, message: t.Optional[t.Any] = None) -> None:
         code = ERROR_SESSIONSVC[0]
         message = message or ERROR_SESSIONSVC[1]
@@ -51,6 +64,8 @@ class SessionSvcException(BizException):
 
 
 class SessionNotFoundException(BizException):
+    __slots__ = ()
+
     def __init__(self, message: t.Optional[t.Any] = None) -> None:
         code = ERROR_SESSIONSVC_SESSION_NOT_FOUND[0]
         message = message or ERROR_SESSIONSVC_SESSION_NOT_FOUND[1]
@@ -1,8 +1,9 @@
-import datetime
-import json
 import logging
+import time
 import typing as t
 
+import orjson
+
 
 class JSONFormatter(logging.Formatter):
     """
@@ -13,7 +14,8 @@ class JSONFormatter(logging.Formatter):
     """
 
     def __init__(self) -> None:  # pylint: disable=super-init-not-called
-        pass  # override logging.Formatter constructor
+        # override logging.Formatter constructor
+        self._ts_cache: tuple[int, str] = (-1, "")  # (second, formatted "YYYY-MM-DDTHH:MM:SS" prefix)
 
     def format(self, record: logging.LogRecord) -> str:
         event = {
@@ -29,10 +31,16 @@ class JSONFormatter(logging.Formatter):
             event["exc_info"] = self.formatException(record.exc_info)
         if record.stack_info:
             event["stack_info"] = self.formatStack(record.stack_info)
-        return json.dumps(event)
+        return orjson.dumps(event).decode()
 
     def get_timestamp(self, created: float) -> str:
-        return datetime.datetime.utcfromtimestamp(created).isoformat()
+        # records in a burst mostly share the same second, so only the fractional part is formatted per record
+        sec = int(created)
+        cached_sec, prefix = self._ts_cache
+        if sec != cached_sec:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+            self._ts_cache = (sec, prefix)
+        return f"{prefix}.{int((created - sec) * 1_000_000):06d}Z"
 
 
 class LoggerAdapter(logging.LoggerAdapter):
@@ -53,6 +61,12 @@ class LoggerAdapter(logging.LoggerAdapter):
 
 
 def init() -> None:
+    # none of these LogRecord attributes are rendered by JSONFormatter, don't pay for collecting them on every record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging._srcfile = None  # pylint: disable=protected-access
+
     formatter = JSONFormatter()
     handler = logging.StreamHandler()
     handler.setFormatter(formatter)
@@ -1,19 +1,45 @@
-import logging as log
+import asyncio
+import logging
+import os
 import typing as t
-import uuid
-from dataclasses import dataclass
+from dataclasses import (
+    dataclass,
+    field,
+)
 from enum import Enum
-from http.cookies import SimpleCookie
 
-from websockets import WebSocketServerProtocol
+from websockets import (
+    ConnectionClosed,
+    WebSocketServerProtocol,
+)
+from websockets.frames import Opcode
+from websockets.protocol import State
 
 from sigsvc.auth.handle import (
     FLASK_SESSION_COOKIE_NAME,
+    WS_CONN_ID_COOKIE_NAME,
+    AuthContext,
     get_user_id,
 )
+from sigsvc.biz.cookie import find_cookies
 from sigsvc.biz.errors import RequestValidationException
 
-WS_CONN_ID_COOKIE_NAME = "sigsvc_wsconnid"
+PEER_COOKIE_NAMES = frozenset((WS_CONN_ID_COOKIE_NAME, FLASK_SESSION_COOKIE_NAME))
+
+OUT_QUEUE_MAX_SIZE = 256  # messages pending for a peer which doesn't keep up, it gets disconnected beyond that
+OUT_QUEUE_OVERFLOW_CLOSE_CODE = 1008  # policy violation
+SENDER_FAILURE_CLOSE_CODE = 1011  # internal error
+SEND_BATCH_MAX_SIZE = 64 * 1024  # bytes of queued messages written to the socket before waiting for it to drain
+
+LOG_MSG_MAX_LEN = 512  # SDP offers/answers are multi-KB, keep per-record cost bounded
+
+log = logging.getLogger("sigsvc.peer")
+
+
+def new_peer_id() -> str:
+    """Random (version 4) UUID in its canonical form, without going through the uuid.UUID machinery."""
+    h = os.urandom(16).hex()
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
 
 
 class PeerRole(Enum):
@@ -21,7 +47,7 @@ class PeerRole(Enum):
     CONSUMER = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class Peer:
     id: str
     ws: WebSocketServerProtocol
@@ -29,37 +55,149 @@ class Peer:
     user_id: t.Optional[int] = None  # value comes from the flask session cookie, only for consumer session (UA)
     role: t.Optional[PeerRole] = None
     meta: t.Optional[t.Dict] = None
+    list_response: t.Optional[str] = None  # producers only: pre-rendered response to the consumer's list() call
+    # sessions are bound to the peer id, which is only ever passed to sessionsvc on create/start session calls
+    has_sessions: bool = False
+    # the other end of the stream, linked when the producer declares the consumer it's prepared the stream for
+    producer_peer: t.Optional["Peer"] = field(default=None, repr=False, compare=False)
+    consumer_peer: t.Optional["Peer"] = field(default=None, repr=False, compare=False)
+    # outbound messages are written by the sender task, so a slow peer never stalls the handler of another one
+    out_queue: asyncio.Queue[str] = field(default_factory=lambda: asyncio.Queue(OUT_QUEUE_MAX_SIZE), repr=False)
+    sender: t.Optional[asyncio.Task[None]] = field(default=None, repr=False)
+    closing: t.Optional[asyncio.Task[None]] = field(default=None, repr=False)
+    sending: bool = field(default=False, repr=False)  # sender task has taken messages off the queue
 
     async def send(self, msg: str) -> None:
-        log.info(f">>> {self.id} [{self.role}]: {msg}")  # pylint: disable=logging-fstring-interpolation
-        await self.ws.send(msg)
+        """Sends the message right away if the socket can take it, or else queues it for the sender task; never blocks."""
+        if self.closing is not None:
+            log.debug("peer %s is being disconnected, message dropped", self.id)
+            return
+        if log.isEnabledFor(logging.INFO):
+            log.info(">>> %s [%s]: %s", self.id, self.role, msg[:LOG_MSG_MAX_LEN])
+        if self.try_send_nowait(msg):
+            return
+        try:
+            self.out_queue.put_nowait(msg)
+        except asyncio.QueueFull:
+            log.warning("peer %s doesn't keep up with outbound messages, disconnecting", self.id)
+            self.closing = asyncio.create_task(self.ws.close(OUT_QUEUE_OVERFLOW_CLOSE_CODE, "outbound queue overflow"))
+            self.closing.add_done_callback(self._closing_done)
+
+    def _closing_done(self, task: asyncio.Task[None]) -> None:
+        if not task.cancelled() and (e := task.exception()) is not None:
+            log.error("peer %s disconnect failed: %s", self.id, e)
+
+    def try_send_nowait(self, msg: str) -> bool:
+        """Writes the frame straight to the transport, skipping the queue and the sender task wakeup.
+
+        Only possible while nothing is pending for the peer (to keep messages in order) and the transport write buffer
+        is below its low watermark, i.e. no flow control wait would be needed after the write.
+        Relies on the websockets legacy protocol internals, as the sender task does.
+        """
+        ws = self.ws
+        if self.sending or not self.out_queue.empty() or ws.state is not State.OPEN:
+            return False
+        try:
+            transport = ws.transport
+            if transport.get_write_buffer_size() > transport.get_write_buffer_limits()[0]:
+                return False
+            ws.write_frame_sync(True, Opcode.TEXT, msg.encode())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # e.g. the transport went away during the closing handshake: leave it to the sender task
+            log.debug("peer %s direct send failed: %s", self.id, e)
+            return False
+        return True
+
+    def link_consumer(self, consumer: "Peer") -> None:
+        self.unlink()
+        consumer.unlink()
+        self.consumer_peer = consumer
+        consumer.producer_peer = self
+
+    def unlink(self) -> None:
+        """Breaks the consumer <-> producer link the peer is part of, if any.
+
+        The other side is only unlinked if it still points back to this peer: e.g. a resumed container may have already
+        connected a new producer for the same consumer when its old connection gets closed.
+        """
+        if self.producer_peer is not None and self.producer_peer.consumer_peer is self:
+            self.producer_peer.consumer_peer = None
+        if self.consumer_peer is not None and self.consumer_peer.producer_peer is self:
+            self.consumer_peer.producer_peer = None
+        self.producer_peer = self.consumer_peer = None
+
+    def start_sending(self) -> None:
+        self.sender = asyncio.create_task(self._send_loop())
+
+    def stop_sending(self) -> None:
+        if self.sender:
+            self.sender.cancel()
+
+    async def _send_loop(self) -> None:
+        """Writes out everything queued since the last wakeup (e.g. a burst of ICE candidates) at once.
+
+        Messages can't be merged into a single frame without changing the protocol, but their frames are written back
+        to back with a single flow control wait, instead of a drain per ws.send().
+        ensure_open(), write_frame_sync() and drain() are internals of the websockets legacy protocol, that's why
+        websockets is pinned to the minor version they were checked against.
+        """
+        ws = self.ws
+        try:
+            while True:
+                msg = await self.out_queue.get()
+                self.sending = True
+                await ws.ensure_open()
+                size = 0
+                while True:
+                    data = msg.encode()
+                    ws.write_frame_sync(True, Opcode.TEXT, data)
+                    size += len(data)
+                    if size >= SEND_BATCH_MAX_SIZE or self.out_queue.empty():
+                        break
+                    msg = self.out_queue.get_nowait()
+                self.sending = False
+                await ws.drain()
+        except ConnectionClosed:
+            pass
+        except Exception:  # pylint: disable=broad-exception-caught
+            # nothing would be delivered to the peer anymore: disconnect it rather than leave it hanging
+            log.exception("peer %s sender failed, disconnecting", self.id)
+            self.sending = False
+            await ws.close(SENDER_FAILURE_CLOSE_CODE, "internal error")
 
     async def receive(self) -> str:
         msg = await self.ws.recv()
-        log.info(f"<<< {self.id} [{self.role}]: {msg}")  # pylint: disable=logging-fstring-interpolation
+        if log.isEnabledFor(logging.INFO):
+            log.info("<<< %s [%s]: %s", self.id, self.role, msg[:LOG_MSG_MAX_LEN])
         return msg
 
     async def close(self) -> None:
+        self.stop_sending()
         await self.ws.close()
 
     @classmethod
     def from_ws(cls, websocket: WebSocketServerProtocol) -> t.Self:
-        peer_id = str(uuid.uuid4())
-        user_id = None
-        ws_conn_id = None
-        if "cookie" in websocket.request_headers:
-            raw_cookie = websocket.request_headers["cookie"]
-            cookie = SimpleCookie()
-            cookie.load(raw_cookie)
+        peer_id = new_peer_id()
+        ctx: t.Optional[AuthContext] = getattr(websocket, "auth_ctx", None)
+        if ctx is not None and ctx.authenticated:
+            # cookies were already parsed (and the session verified) by auth() during the handshake
+            ws_conn_id, user_id = ctx.ws_conn_id, ctx.user_id
+            if ws_conn_id is None:
+                raise RequestValidationException(f"no {WS_CONN_ID_COOKIE_NAME} cookie found")
+        elif "cookie" in websocket.request_headers:
+            user_id = None
+            cookie = find_cookies(websocket.request_headers["cookie"], PEER_COOKIE_NAMES)
             if WS_CONN_ID_COOKIE_NAME in cookie:
-                ws_conn_id = cookie[WS_CONN_ID_COOKIE_NAME].value
+                ws_conn_id = cookie[WS_CONN_ID_COOKIE_NAME]
             else:
                 raise RequestValidationException(f"no {WS_CONN_ID_COOKIE_NAME} cookie found")
             if FLASK_SESSION_COOKIE_NAME in cookie:
                 # this is a consumer (UA) connection, producer (streamd) uses auth token instead
-                session_cookie = cookie[FLASK_SESSION_COOKIE_NAME].value
+                session_cookie = cookie[FLASK_SESSION_COOKIE_NAME]
                 user_id = get_user_id(session_cookie)
         else:
             raise RequestValidationException("no cookies found")
         # `role` and `meta`` will be set later through the setPeerStatus() call.
-        return cls(ws=websocket, id=peer_id, ws_conn_id=ws_conn_id, user_id=user_id)
+        peer = cls(ws=websocket, id=peer_id, ws_conn_id=ws_conn_id, user_id=user_id)
+        peer.start_sending()
+        return peer
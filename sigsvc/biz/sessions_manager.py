@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import typing as t
+from collections import OrderedDict
 
 import sigsvc.services.dto.sessionsvc as dto_sessionsvc
 from sigsvc.biz.dto import (
@@ -18,13 +20,22 @@ from sigsvc.services import sessionsvc
 
 log = logging.getLogger("sigsvc")
 
+SESSIONS_CACHE_MAX_SIZE = 10_000
+
 
 class SessionsManager:
-    sessions_cache: t.Dict[str, Session] = {}
+    def __init__(self, cache_max_size: int = SESSIONS_CACHE_MAX_SIZE) -> None:
+        # LRU: most recently used sessions are at the end
+        self.sessions_cache: OrderedDict[str, Session] = OrderedDict()
+        self.cache_max_size = cache_max_size
+        # sessionsvc fetches in progress, concurrent get_session() calls for the same session share a single request
+        self.inflight: t.Dict[str, asyncio.Task[t.Optional[Session]]] = {}
 
     def invalidate_cache(self, session_id: str) -> None:
         if session_id in self.sessions_cache:
             del self.sessions_cache[session_id]
+        # a fetch started before the change may bring the stale state: let its waiters have it, but don't cache it
+        self.inflight.pop(session_id, None)
 
     def set_session_ending(self, session_id: str) -> None:
         if session_id in self.sessions_cache:
@@ -62,7 +73,10 @@ class SessionsManager:
                 )
             ),
         )
-        await self.get_session(session_id)  # upd cache
+        # anything fetched during the call may predate the start (no producer yet): drop it and refetch in the
+        # background; callers notify the peers meanwhile, their first peer messages join the fetch
+        self.invalidate_cache(session_id)
+        self._start_fetch(session_id)
 
     async def pause_session(self, session_id: str) -> None:
         await sessionsvc.pause_session(session_id)
@@ -74,18 +88,43 @@ class SessionsManager:
 
     async def get_session(self, session_id: str) -> t.Optional[Session]:
         if session_id in self.sessions_cache:
+            self.sessions_cache.move_to_end(session_id)
             return self.sessions_cache[session_id]
+        task = self.inflight.get(session_id) or self._start_fetch(session_id)
+        # shielded: a cancelled caller must not cancel the fetch for the other waiters
+        return await asyncio.shield(task)
+
+    def _start_fetch(self, session_id: str) -> asyncio.Task[t.Optional[Session]]:
+        task = asyncio.create_task(self._fetch_session(session_id))
+        task.add_done_callback(lambda _: self._fetch_done(session_id, task))
+        self.inflight[session_id] = task
+        return task
+
+    def _fetch_done(self, session_id: str, task: asyncio.Task[t.Optional[Session]]) -> None:
+        if self.inflight.get(session_id) is task:
+            del self.inflight[session_id]
+        if not task.cancelled() and (e := task.exception()) is not None:
+            # logged here, as every waiter might have been cancelled (or there were none, e.g. on start_session)
+            log.error("fetching session %s failed: %s", session_id, e)
+
+    async def _fetch_session(self, session_id: str) -> t.Optional[Session]:
         try:
             res = await sessionsvc.get_session(session_id)
         except sessionsvc.SessionNotFoundException:
             log.warning("session %s wasn't found", session_id)
             return None
         new_session = Session.from_sessiondc(res.session)
+        if self.inflight.get(session_id) is not asyncio.current_task():
+            # cache was invalidated while fetching
+            return new_session
         # upd cache
         old_session = self.sessions_cache.get(session_id, None)
         if old_session:  # TODO: dirty patch
             new_session.ending = old_session.ending
         self.sessions_cache[session_id] = new_session
+        self.sessions_cache.move_to_end(session_id)
+        if len(self.sessions_cache) > self.cache_max_size:
+            self.sessions_cache.popitem(last=False)
         return new_session
 
     async def get_user_sessions(self, user_id: int) -> list[Session]:
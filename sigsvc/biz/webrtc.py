@@ -1,17 +1,17 @@
 import asyncio
-import json
 import logging as log
 import typing as t
 
+import orjson
+from marshmallow import Schema
 from websockets import ConnectionClosedError
 from websockets.legacy.server import WebSocketServerProtocol
 
 from sigsvc.biz.dto import (
+    EMPTY_LIST_RESPONSE,
+    REQUEST_SCHEMAS,
     CreateSessionRequestDTO,
-    CreateSessionResponseDTO,
     EndSessionRequestDTO,
-    EndSessionResponseDTO,
-    ErrorResponseDTO,
     GetSessionRequestDTO,
     GetSessionResponseDTO,
     GetSessionsResponseDTO,
@@ -22,7 +22,11 @@ from sigsvc.biz.dto import (
     SetPeerStatusRequestDTO,
     StartSessionRequestDTO,
     SubmitWebRtcStatsRequestDTO,
-    WelcomeResponseDTO,
+    error_response,
+    get_schema,
+    session_created_response,
+    session_ended_response,
+    welcome_response,
 )
 from sigsvc.biz.errors import (
     BizException,
@@ -36,13 +40,8 @@ from sigsvc.biz.peer import (
 from sigsvc.biz.sessions_manager import SessionsManager
 from sigsvc.services.sessionsvc import SessionSvcException
 
-# pylint: disable=logging-fstring-interpolation
-
-
 peers: t.Dict[str, Peer] = {}
 
-consumers_to_producers_map: t.Dict[str, str] = {}
-
 sessions_manager: SessionsManager = SessionsManager()
 
 
@@ -60,27 +59,40 @@ async def handle_connection_closed(peer: Peer) -> None:
     In each of these scenarios, we need to remove the relevant peer from the list of known peers and terminate all
     active sessions associated with that peer.
     """
-    log.debug(f"handle_connection_closed - initiated by peer: {peer.id} (role: {peer.role})")
+    log.debug("handle_connection_closed - initiated by peer: %s (role: %s)", peer.id, peer.role)
+    peer.stop_sending()
+    peer.unlink()
     if peer.id not in peers:
         # this is expected for cases when e.g. paused container resumes and old connection to it (with old peer_id)
         # is getting closed (this is raised from the container side on resume)
         # we should simply ignore this connection close event
-        log.error(f"handle_connection_closed - unknown peer (from resumed container?): {peer.id}")
+        log.error("handle_connection_closed - unknown peer (from resumed container?): %s", peer.id)
         return
     del peers[peer.id]
+    if not peer.has_sessions:
+        # the peer never created or started a session (e.g. connected, listed and left): nothing to end
+        return
     peer_sessions = await sessions_manager.get_peer_sessions(peer)
-    for session in peer_sessions:
-        # only sessions closed by consumer should be paused: perform "soft" end_session (aka pause);
-        # if producer closes the session, then container doesn't exist anymore: perform "hard" end_session (aka close)
-        await handle_end_session(peer, EndSessionRequestDTO(sessionId=session.id, soft=peer.role == PeerRole.CONSUMER))
+    # only sessions closed by consumer should be paused: perform "soft" end_session (aka pause);
+    # if producer closes the session, then container doesn't exist anymore: perform "hard" end_session (aka close)
+    soft = peer.role == PeerRole.CONSUMER
+    # sessions are independent, so their sessionsvc round-trips are run concurrently
+    results = await asyncio.gather(
+        *(handle_end_session(peer, EndSessionRequestDTO(sessionId=session.id, soft=soft)) for session in peer_sessions),
+        return_exceptions=True,
+    )
+    for session, res in zip(peer_sessions, results):
+        if isinstance(res, BaseException):
+            log.error("handle_connection_closed - failed to end session: %s, error: %s", session.id, res)
 
 
-async def handle_end_session(peer: Peer, req: EndSessionRequestDTO) -> None:
+async def handle_end_session(peer: Peer, req: EndSessionRequestDTO, raw_msg: t.Optional[str] = None) -> None:
     """
     The consumer has the ability to end the session by explicitly terminating the stream from the user interface (UI).
     Also called in case of a connection close (see handle_connection_closed).
+    When the request came from the wire, its raw_msg is forwarded to the other peer as is.
     """
-    log.debug(f"handle_end_session - peer: {peer.id} (role: {peer.role})")
+    log.debug("handle_end_session - peer: %s (role: %s)", peer.id, peer.role)
     direct = True
     if peer.id not in peers:
         # indirect call (e.g. from the handle_connection_closed handler)
@@ -96,7 +108,7 @@ async def handle_end_session(peer: Peer, req: EndSessionRequestDTO) -> None:
             log.info("hope session will be terminated properly")
             if direct and peer.role == PeerRole.CONSUMER:
                 # only consumers explicitly calling endSession know how to handle sessionEnded events
-                await peer.send(EndSessionResponseDTO.Schema().dumps(EndSessionResponseDTO(session_id=req.sessionId)))
+                await peer.send(session_ended_response(req.sessionId))
             return
         sessions_manager.set_session_ending(req.sessionId)
         other_peer_id = session.other_peer_id(peer.id)
@@ -105,76 +117,81 @@ async def handle_end_session(peer: Peer, req: EndSessionRequestDTO) -> None:
         if other_peer_id:
             other_peer = peers.get(other_peer_id, None)
             if other_peer:
-                await other_peer.send(EndSessionRequestDTO.Schema().dumps(req))
-                del peers[other_peer_id]
+                await other_peer.send(raw_msg if raw_msg is not None else get_schema(EndSessionRequestDTO).dumps(req))
+                peers.pop(other_peer_id, None)
     except Exception as e:  # pylint: disable=broad-exception-caught
-        log.error(f"handle_end_session error: {e}")
+        log.error("handle_end_session error: %s", e)
     if not session:
         return
     # so there is a session, but we've crashed in the try/catch block above
     if req.soft:
-        log.debug(f"pausing session: {session.id}")
+        log.debug("pausing session: %s", session.id)
         await sessions_manager.pause_session(session_id=session.id)
     else:
-        log.debug(f"closing session: {session.id}")
+        log.debug("closing session: %s", session.id)
         await sessions_manager.close_session(session_id=session.id)
     if direct and peer.role == PeerRole.CONSUMER:
         # only consumers know how to handle sessionEnded events
-        await peer.send(EndSessionResponseDTO.Schema().dumps(EndSessionResponseDTO(session_id=session.id)))
+        await peer.send(session_ended_response(session.id))
 
 
-async def handle_peer_msg(peer: Peer, req: dict) -> None:
-    log.debug(f"handle_peer_msg - peer: {peer.id}")
+async def handle_peer_msg(peer: Peer, session_id: str, raw_msg: str) -> None:
+    """Relays WebRTC negotiation messages (SDP offers/answers, ICE candidates) to the other session peer verbatim."""
+    if log.getLogger().isEnabledFor(log.DEBUG):  # relayed for every negotiation message
+        log.debug("handle_peer_msg - peer: %s", peer.id)
     try:
-        session = await sessions_manager.get_session(req["sessionId"])
+        session = await sessions_manager.get_session(session_id)
         if not session:
-            log.error("handle_peer_msg: session %s not found", req["sessionId"])
+            log.error("handle_peer_msg: session %s not found", session_id)
             return
     except SessionSvcException as e:
-        log.error(f"handle_peer_msg: {e}")
+        log.error("handle_peer_msg: %s", e)
         return
     other_peer_id = session.other_peer_id(peer.id)
     if other_peer_id:
         other_peer = peers.get(other_peer_id, None)
         if other_peer:
-            await other_peer.send(json.dumps(req))
+            await other_peer.send(raw_msg)
 
 
 async def handle_start_session(session_id: str, peer_producer_id: str, peer_consumer: Peer) -> None:
     log.debug(
-        f"handle_start_session - session_id: {session_id}, producer: {peer_producer_id}, consumer: {peer_consumer.id}"
+        "handle_start_session - session_id: %s, producer: %s, consumer: %s",
+        session_id,
+        peer_producer_id,
+        peer_consumer.id,
     )
     peer_producer = peers.get(peer_producer_id, None)
     if not peer_producer:
         raise UnknownPeerException(f"producer peer (id: {peer_producer_id}) is unknown")
+    # set before the call: the session may get bound to the peers even if the call itself fails
+    peer_producer.has_sessions = peer_consumer.has_sessions = True
     await sessions_manager.start_session(session_id, peer_consumer.ws_conn_id, peer_producer.id, peer_consumer.id)
     await peer_producer.send(
-        StartSessionRequestDTO.Schema().dumps(StartSessionRequestDTO(peerId=peer_consumer.id, sessionId=session_id))
+        get_schema(StartSessionRequestDTO).dumps(StartSessionRequestDTO(peerId=peer_consumer.id, sessionId=session_id))
     )
     await peer_consumer.send(
-        SessionStartedRequestDTO.Schema().dumps(SessionStartedRequestDTO(peerId=peer_producer.id, sessionId=session_id))
+        get_schema(SessionStartedRequestDTO).dumps(
+            SessionStartedRequestDTO(peerId=peer_producer.id, sessionId=session_id)
+        )
     )
 
 
 async def handle_list(peer: Peer) -> None:
     """Handles a list request for a consumer."""
-    log.debug(f"handle_list - peer: {peer.id}")
-    if peer.id in consumers_to_producers_map:
-        producer_id = consumers_to_producers_map[peer.id]
-        if producer_id in peers:
-            await peer.send(
-                ListResponseDTO.Schema().dumps(
-                    ListResponseDTO(producers=[ListResponseDTO.Producer(id=producer_id, meta=peers[producer_id].meta)])
-                )
-            )
+    log.debug("handle_list - peer: %s", peer.id)
+    producer = peer.producer_peer
+    if producer is not None:
+        if producer.id in peers and producer.list_response:
+            await peer.send(producer.list_response)
         return
-    await peer.send(ListResponseDTO.Schema().dumps(ListResponseDTO(producers=[])))
+    await peer.send(EMPTY_LIST_RESPONSE)
 
 
 async def handle_set_peer_status(peer: Peer, req: SetPeerStatusRequestDTO) -> None:
-    log.debug(f"handle_set_peer_status - peer: {peer.id}")
+    log.debug("handle_set_peer_status - peer: %s", peer.id)
     peer.meta = req.meta
-    res = PeerStatusResponseDTO.Schema().dumps(
+    res = get_schema(PeerStatusResponseDTO).dumps(
         PeerStatusResponseDTO(
             roles=req.roles,
             meta=peer.meta,
@@ -186,12 +203,18 @@ async def handle_set_peer_status(peer: Peer, req: SetPeerStatusRequestDTO) -> No
     elif "producer" in req.roles:
         peer.role = PeerRole.PRODUCER
         # producer (peer.id) has joined and prepared a stream for consumerId
-        # if consumer has not yet connected, it will obtain a producer reference in a list() call response later
+        # it's linked to the consumer only if the consumer is connected: consumerId is a per-connection peer id, so an
+        # absent consumer is gone for good and its list() calls will never reach this producer
+        # list() response is pre-rendered once, consumer may poll it before the stream is ready
+        peer.list_response = get_schema(ListResponseDTO).dumps(
+            ListResponseDTO(producers=[ListResponseDTO.Producer(id=peer.id, meta=peer.meta)])
+        )
         if peer.meta and "consumerId" in peer.meta:
             consumer_id = peer.meta["consumerId"]
-            consumers_to_producers_map[consumer_id] = peer.id
-            if consumer_id in peers:
-                await peers[consumer_id].send(res)
+            consumer = peers.get(consumer_id)
+            if consumer:
+                peer.link_consumer(consumer)
+                await consumer.send(res)
     else:
         raise RequestValidationException(f"unknown peer role: {req.roles}")
     # we always need to send a confirmation to the original peer as well
@@ -199,14 +222,15 @@ async def handle_set_peer_status(peer: Peer, req: SetPeerStatusRequestDTO) -> No
 
 
 async def handle_create_session(peer: Peer, req: CreateSessionRequestDTO) -> None:
+    peer.has_sessions = True
     res = await sessions_manager.create_session(peer, req)
-    await peer.send(CreateSessionResponseDTO.Schema().dumps(CreateSessionResponseDTO(session_id=res.session_id)))
+    await peer.send(session_created_response(res.session_id))
 
 
 async def handle_get_session(peer: Peer, req: GetSessionRequestDTO) -> None:
     res = await sessions_manager.get_session(req.sessionId)
     if res:
-        await peer.send(GetSessionResponseDTO.Schema().dumps(GetSessionResponseDTO(res)))
+        await peer.send(get_schema(GetSessionResponseDTO).dumps(GetSessionResponseDTO(res)))
     else:
         await peer.send("{}")
 
@@ -220,61 +244,85 @@ async def handle_get_sessions(peer: Peer) -> None:
         res = await sessions_manager.get_producer_sessions(peer.id)
     else:
         raise RequestValidationException(f"unknown peer role: {peer.role}")
-    await peer.send(GetSessionsResponseDTO.Schema().dumps(GetSessionsResponseDTO(sessions=res)))
+    await peer.send(get_schema(GetSessionsResponseDTO).dumps(GetSessionsResponseDTO(sessions=res)))
 
 
 async def handle_submit_webrtc_stats(req: SubmitWebRtcStatsRequestDTO) -> None:
     await sessions_manager.submit_webrtc_stats(req.sessionId, req.stats)
 
 
+RequestHandler = t.Callable[[Peer, t.Any], t.Awaitable[None]]
+
+# adapters bring all the handlers to the same (peer, req) signature
+REQUEST_HANDLERS: t.Dict[RequestType, RequestHandler] = {
+    RequestType.SET_PEER_STATUS: handle_set_peer_status,
+    RequestType.LIST: lambda peer, req: handle_list(peer),
+    RequestType.CREATE_SESSION: handle_create_session,
+    RequestType.START_SESSION: lambda peer, req: handle_start_session(
+        session_id=req.sessionId, peer_producer_id=req.peerId, peer_consumer=peer
+    ),
+    RequestType.GET_SESSIONS: lambda peer, req: handle_get_sessions(peer),
+    RequestType.GET_SESSION: handle_get_session,
+    RequestType.SUBMIT_WEBRTC_STATS: lambda peer, req: handle_submit_webrtc_stats(req),
+}
+
+# inbound message `type` -> (schema to load the request with, handler): a single lookup per inbound message,
+# keyed by plain strings so the decoded `type` is matched without going through RequestType
+DISPATCH: t.Dict[str, t.Tuple[t.Optional[Schema], RequestHandler]] = {
+    req_type.value: (REQUEST_SCHEMAS.get(req_type), req_handler) for req_type, req_handler in REQUEST_HANDLERS.items()
+}
+PEER_MSG_TYPE: str = RequestType.PEER.value
+END_SESSION_MSG_TYPE: str = RequestType.END_SESSION.value
+END_SESSION_SCHEMA: Schema = REQUEST_SCHEMAS[RequestType.END_SESSION]
+
+
 async def handler(websocket: WebSocketServerProtocol) -> None:
     """Main webrtc signaling handler."""
     peer = Peer.from_ws(websocket)
     peers[peer.id] = peer
 
-    # `connection closed` handler setup
-    closed = asyncio.ensure_future(websocket.wait_closed())
-    closed.add_done_callback(lambda task: asyncio.create_task(handle_connection_closed(peer)))
-
-    await peer.send(WelcomeResponseDTO.Schema().dumps(WelcomeResponseDTO(peerId=peer.id)))
-
-    async for msg in peer.ws:
-        try:
-            msg = json.loads(msg)
-            if msg["type"] == RequestType.SET_PEER_STATUS.value:
-                await handle_set_peer_status(peer, SetPeerStatusRequestDTO.Schema().load(data=msg))
-            elif msg["type"] == RequestType.LIST.value:
-                await handle_list(peer)
-            elif msg["type"] == RequestType.CREATE_SESSION.value:
-                await handle_create_session(peer, CreateSessionRequestDTO.Schema().load(data=msg))
-            elif msg["type"] == RequestType.START_SESSION.value:
-                req_start_session: StartSessionRequestDTO = StartSessionRequestDTO.Schema().load(data=msg)
-                await handle_start_session(
-                    session_id=req_start_session.sessionId,
-                    peer_producer_id=req_start_session.peerId,
-                    peer_consumer=peer,
+    try:
+        await peer.send(welcome_response(peer.id))
+
+        async for raw_msg in peer.ws:
+            try:
+                if not isinstance(raw_msg, str):
+                    # relayed messages always go out as text frames
+                    raw_msg = raw_msg.decode()
+                msg = orjson.loads(raw_msg)
+                msg_type = msg["type"]
+                if msg_type == PEER_MSG_TYPE:
+                    # the most frequent message during negotiation, relayed as is without re-serialization
+                    # TODO: peer request contains dynamic attributes, so it's not loaded into a dataclass DTO.
+                    await handle_peer_msg(peer, msg["sessionId"], raw_msg)
+                    continue
+                if msg_type == END_SESSION_MSG_TYPE:
+                    # forwarded to the other peer as received, without re-serializing the loaded request
+                    await handle_end_session(peer, END_SESSION_SCHEMA.load(data=msg), raw_msg)
+                    continue
+                dispatch = DISPATCH.get(msg_type)
+                if dispatch is None:
+                    raise RequestValidationException(f"unknown request type: {msg}")
+                schema, req_handler = dispatch
+                await req_handler(peer, schema.load(data=msg) if schema is not None else msg)
+            except ConnectionClosedError as e:
+                log.warning("connection closed error: %s, peer_id: %s, connection_id: %s", e, peer.id, peer.ws.id)
+                break
+            except BizException as e:
+                log.error("biz exception occured: %s, peer_id: %s, connection_id: %s", e, peer.id, peer.ws.id)
+                await peer.send(error_response(e.code, e.message))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                log.error(
+                    "exception occured in the msg polling loop: %s, peer_id: %s, connection_id: %s",
+                    e,
+                    peer.id,
+                    peer.ws.id,
                 )
-            elif msg["type"] == RequestType.PEER.value:
-                # TODO: peer request contains dynamic attributes, so handling it as a dict.
-                # Change it to the dataclass DTO.
-                await handle_peer_msg(peer, msg)
-            elif msg["type"] == RequestType.END_SESSION.value:
-                await handle_end_session(peer, EndSessionRequestDTO.Schema().load(data=msg))
-            elif msg["type"] == RequestType.GET_SESSIONS.value:
-                await handle_get_sessions(peer)
-            elif msg["type"] == RequestType.GET_SESSION.value:
-                await handle_get_session(peer, GetSessionRequestDTO.Schema().load(data=msg))
-            elif msg["type"] == RequestType.SUBMIT_WEBRTC_STATS.value:
-                await handle_submit_webrtc_stats(SubmitWebRtcStatsRequestDTO.Schema().load(data=msg))
-            else:
-                raise RequestValidationException(f"unknown request type: {msg}")
-        except ConnectionClosedError as e:
-            log.warning(f"connection closed error: {e}, peer_id: {peer.id}, connection_id: {peer.ws.id}")
-            break
-        except BizException as e:
-            log.error(f"biz exception occured: {e}, peer_id: {peer.id}, connection_id: {peer.ws.id}")
-            await peer.send(ErrorResponseDTO.Schema().dumps(ErrorResponseDTO(code=e.code, message=e.message)))
+    finally:
+        # the polling loop exits once the connection is closed, so the cleanup runs in the same task
+        try:
+            await handle_connection_closed(peer)
         except Exception as e:  # pylint: disable=broad-exception-caught
             log.error(
-                f"exception occured in the msg polling loop: {e}, peer_id: {peer.id}, connection_id: {peer.ws.id}"
+                "exception occured on connection close: %s, peer_id: %s, connection_id: %s", e, peer.id, peer.ws.id
             )
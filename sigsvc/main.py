@@ -3,26 +3,41 @@ import logging as log
 import os
 import typing as t
 
+import uvloop
 import websockets
-from websockets.legacy.server import HTTPResponse
-
-from sigsvc.auth.handle import auth
+from websockets.legacy.server import (
+    HTTPResponse,
+    WebSocketServerProtocol,
+)
+
+from sigsvc.auth.handle import (
+    AuthContext,
+    auth,
+    log_digest_backend,
+)
 from sigsvc.biz.log import LoggerAdapter
 from sigsvc.biz.log import init as log_init
 from sigsvc.biz.webrtc import handler as webrtc_handler
+from sigsvc.services.misc import close_shared_client
 
 LISTEN_IP = os.environ.get("LISTEN_IP")
 LISTEN_PORT = os.environ.get("LISTEN_PORT")
 
 
-async def process_request(path: str, request_headers: websockets.Headers) -> t.Optional[HTTPResponse]:
-    """Called during initial handshake.
+class ServerProtocol(WebSocketServerProtocol):
+    """Keeps the credentials extracted during the handshake around for the connection handler (see Peer.from_ws)."""
+
+    auth_ctx: t.Optional[AuthContext] = None
+
+    async def process_request(self, path: str, request_headers: websockets.Headers) -> t.Optional[HTTPResponse]:
+        """Called during initial handshake.
 
-    Yields `None` upon successful processing, or else provides an `HTTPResponse` (with an error code) to interrupt the
-    initial handshake.
-    """
-    log.debug(f"request path: {path}")  # pylint: disable=logging-fstring-interpolation
-    return await auth(request_headers)
+        Yields `None` upon successful processing, or else provides an `HTTPResponse` (with an error code) to interrupt
+        the initial handshake.
+        """
+        log.debug("request path: %s", path)
+        self.auth_ctx = AuthContext()
+        return await auth(request_headers, self.auth_ctx)
 
 
 async def main() -> None:
@@ -30,12 +45,16 @@ async def main() -> None:
         webrtc_handler,
         host=LISTEN_IP,
         port=LISTEN_PORT,
-        process_request=process_request,
+        create_protocol=ServerProtocol,
         logger=LoggerAdapter(log.getLogger("websockets.server"), None),
     ):
-        await asyncio.Future()
+        try:
+            await asyncio.Future()
+        finally:
+            await close_shared_client()
 
 
 if __name__ == "__main__":
     log_init()
-    asyncio.run(main())
+    log_digest_backend()
+    uvloop.run(main())
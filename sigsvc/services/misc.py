@@ -1,6 +1,6 @@
 import typing as t
-from types import TracebackType
 
+import aiohttp
 from aiohttp_retry import (
     ExponentialRetry,
     RetryClient,
@@ -9,32 +9,42 @@ from aiohttp_retry import (
 CONN_TIMEOUT = 3
 READ_TIMEOUT = 10
 
+CONN_POOL_SIZE = 256
+CONN_KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
 
-async def get_http_client(read_timeout: int) -> RetryClient:
-    retry_options = ExponentialRetry(attempts=0, start_timeout=3, exceptions={Exception}, retry_all_server_errors=False)
-    client = RetryClient(
-        raise_for_status=False,
-        retry_options=retry_options,
-        conn_timeout=CONN_TIMEOUT,
-        read_timeout=read_timeout,
-    )
-    return client
-
-
-class AsyncHttpClient:
-    def __init__(self, read_timeout: int = READ_TIMEOUT) -> None:
-        self.client = None
-        self.read_timeout = read_timeout
-
-    async def __aenter__(self) -> RetryClient:
-        self.client = await get_http_client(self.read_timeout)
-        return self.client
-
-    async def __aexit__(
-        self,
-        exc_type: t.Optional[t.Type[BaseException]],
-        exc_val: t.Optional[BaseException],
-        exc_tb: t.Optional[TracebackType],
-    ) -> None:
-        if self.client:
-            await self.client.close()
+RETRY_OPTIONS = ExponentialRetry(attempts=0, start_timeout=3, exceptions={Exception}, retry_all_server_errors=False)
+
+
+def http_timeout(read_timeout: int = READ_TIMEOUT) -> aiohttp.ClientTimeout:
+    """Per-request timeout, since the client is shared between calls with different expectations."""
+    return aiohttp.ClientTimeout(total=read_timeout, connect=CONN_TIMEOUT)
+
+
+_shared_client: t.Optional[RetryClient] = None
+
+
+def get_shared_client() -> RetryClient:
+    """Returns the HTTP client shared by all the services calls.
+
+    A single client (and its connection pool) keeps connections alive between calls, so requests don't pay for TCP
+    handshakes and client setup every time. Should be called from within the running event loop.
+    """
+    global _shared_client  # pylint: disable=global-statement
+    if _shared_client is None:
+        _shared_client = RetryClient(
+            raise_for_status=False,
+            retry_options=RETRY_OPTIONS,
+            connector=aiohttp.TCPConnector(
+                limit=CONN_POOL_SIZE, keepalive_timeout=CONN_KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL
+            ),
+            timeout=http_timeout(),
+        )
+    return _shared_client
+
+
+async def close_shared_client() -> None:
+    global _shared_client  # pylint: disable=global-statement
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
@@ -1,6 +1,7 @@
 import logging
 import os
 
+from sigsvc.biz.dto import get_schema
 from sigsvc.biz.errors import (
     SessionNotFoundException,
     SessionSvcException,
@@ -13,156 +14,174 @@ from sigsvc.services.dto.sessionsvc import (
     StartSessionRequestDTO,
     SubmitWebRtcStatsRequestDTO,
 )
-from sigsvc.services.misc import AsyncHttpClient
+from sigsvc.services.misc import (
+    get_shared_client,
+    http_timeout,
+)
 
 SESSIONSVC_URL = os.environ["SESSIONSVC_URL"]
 
+# URL templates are built once; the base URL is escaped as it may contain percent-encoded chars
+_BASE_URL_TMPL = SESSIONSVC_URL.replace("%", "%%")
+SESSION_CREATE_URL = f"{SESSIONSVC_URL}/sessions/create"
+SESSION_START_URL_TMPL = f"{_BASE_URL_TMPL}/sessions/%s/start"
+SESSION_PAUSE_URL_TMPL = f"{_BASE_URL_TMPL}/sessions/%s/pause"
+SESSION_CLOSE_URL_TMPL = f"{_BASE_URL_TMPL}/sessions/%s/close"
+SESSION_STATS_URL_TMPL = f"{_BASE_URL_TMPL}/sessions/%s/stats"
+SESSION_URL_TMPL = f"{_BASE_URL_TMPL}/sessions/%s"
+USER_SESSIONS_URL_TMPL = f"{_BASE_URL_TMPL}/users/%s/sessions"
+CONSUMER_SESSIONS_URL_TMPL = f"{_BASE_URL_TMPL}/consumers/%s/sessions"
+PRODUCER_SESSIONS_URL_TMPL = f"{_BASE_URL_TMPL}/producers/%s/sessions"
+
+CREATE_SESSION_TIMEOUT = http_timeout(read_timeout=55)
+
 log = logging.getLogger("sigsvc.sessionsvc")
 
 
 async def create_session(req: CreateSessionRequestDTO) -> CreateSessionResponseDTO:
-    async with AsyncHttpClient(read_timeout=55) as client:
-        try:
-            async with client.post(
-                url=f"{SESSIONSVC_URL}/sessions/create",
-                json=CreateSessionRequestDTO.Schema().dump(req),
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-                return CreateSessionResponseDTO.Schema().load(data=await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.post(
+            url=SESSION_CREATE_URL,
+            json=get_schema(CreateSessionRequestDTO).dump(req),
+            timeout=CREATE_SESSION_TIMEOUT,
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+            return get_schema(CreateSessionResponseDTO).load(data=await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def start_session(session_id: str, req: StartSessionRequestDTO) -> None:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.post(
-                url=f"{SESSIONSVC_URL}/sessions/{session_id}/start",
-                json=StartSessionRequestDTO.Schema().dump(req),
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.post(
+            url=SESSION_START_URL_TMPL % session_id,
+            json=get_schema(StartSessionRequestDTO).dump(req),
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def pause_session(session_id: str) -> None:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.post(
-                url=f"{SESSIONSVC_URL}/sessions/{session_id}/pause",
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.post(
+            url=SESSION_PAUSE_URL_TMPL % session_id,
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def close_session(session_id: str) -> None:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.post(
-                url=f"{SESSIONSVC_URL}/sessions/{session_id}/close",
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.post(
+            url=SESSION_CLOSE_URL_TMPL % session_id,
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def get_session(session_id: str) -> GetSessionResponseDTO:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.get(
-                url=f"{SESSIONSVC_URL}/sessions/{session_id}",
-            ) as res:
-                res_json = await res.json()
-                if res.status != 200:
-                    if res.status == 409 and res_json["code"] == 1404:
-                        raise SessionNotFoundException()
-                    raise SessionSvcException(res_json)
-                return GetSessionResponseDTO.Schema().load(data=res_json)
-        except SessionSvcException as e:
-            raise e
-        except SessionNotFoundException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.get(
+            url=SESSION_URL_TMPL % session_id,
+        ) as res:
+            res_json = await res.json()
+            if res.status != 200:
+                if res.status == 409 and res_json["code"] == 1404:
+                    raise SessionNotFoundException()
+                raise SessionSvcException(res_json)
+            return get_schema(GetSessionResponseDTO).load(data=res_json)
+    except SessionSvcException as e:
+        raise e
+    except SessionNotFoundException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def get_user_sessions(user_id: int) -> GetSessionsResponseDTO:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.get(
-                url=f"{SESSIONSVC_URL}/users/{user_id}/sessions",
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-                return GetSessionsResponseDTO.Schema().load(data=await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.get(
+            url=USER_SESSIONS_URL_TMPL % user_id,
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+            return get_schema(GetSessionsResponseDTO).load(data=await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def get_consumer_sessions(consumer_id: str) -> GetSessionsResponseDTO:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.get(
-                url=f"{SESSIONSVC_URL}/consumers/{consumer_id}/sessions",
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-                return GetSessionsResponseDTO.Schema().load(data=await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.get(
+            url=CONSUMER_SESSIONS_URL_TMPL % consumer_id,
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+            return get_schema(GetSessionsResponseDTO).load(data=await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def get_producer_sessions(producer_id: str) -> GetSessionsResponseDTO:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.get(
-                url=f"{SESSIONSVC_URL}/producers/{producer_id}/sessions",
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-                return GetSessionsResponseDTO.Schema().load(data=await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.get(
+            url=PRODUCER_SESSIONS_URL_TMPL % producer_id,
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+            return get_schema(GetSessionsResponseDTO).load(data=await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
 
 
 async def submit_webrtc_stats(session_id: str, req: SubmitWebRtcStatsRequestDTO) -> None:
-    async with AsyncHttpClient() as client:
-        try:
-            async with client.post(
-                url=f"{SESSIONSVC_URL}/sessions/{session_id}/stats",
-                json=SubmitWebRtcStatsRequestDTO.Schema().dump(req),
-            ) as res:
-                if res.status != 200:
-                    raise SessionSvcException(await res.json())
-        except SessionSvcException as e:
-            raise e
-        except Exception as e:
-            log.exception(e)
-            raise SessionSvcException from e
+    client = get_shared_client()
+    try:
+        async with client.post(
+            url=SESSION_STATS_URL_TMPL % session_id,
+            json=get_schema(SubmitWebRtcStatsRequestDTO).dump(req),
+        ) as res:
+            if res.status != 200:
+                raise SessionSvcException(await res.json())
+    except SessionSvcException as e:
+        raise e
+    except Exception as e:
+        log.exception(e)
+        raise SessionSvcException from e
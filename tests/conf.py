@@ -1,4 +1,46 @@
+import asyncio
 import os
 
+from websockets import Headers
+from websockets.protocol import State
+
+from sigsvc.auth.handle import WS_CONN_ID_COOKIE_NAME
+
 VALID_FLASK_SESSION_COOKIE = ".eJwtzjkSwjAMAMC_uKaQZEu28pmMrWOgTUjF8HdS0G25n7LnEeezbO_jikfZX162gkEqNOfy6mEZVFtCN8CJEG3aWK1qNGdG4pgRt0XJBIiTAG1ZVvOuIyDINC20okNdQ5Q7-kQhNmJR7Z2gdnAVSYGVXcDLHbnOOP6b8v0BDTwvYg.Zcfhbg.GbEcMbqNxNtzcq5z2VusZHvCz0A"
 VALID_AUTH_TOKEN = os.environ.get("AUTH_TOKEN")
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.buffer_size = 0
+
+    def get_write_buffer_size(self) -> int:
+        return self.buffer_size
+
+    def get_write_buffer_limits(self) -> tuple[int, int]:
+        return 16384, 65536
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.state = State.OPEN
+        self.transport = FakeTransport()
+        self.request_headers = Headers({"cookie": f"{WS_CONN_ID_COOKIE_NAME}=1234"})
+        self.sent: list[str] = []
+        self.close_code = None
+        self.drains = 0
+        self.unblocked = asyncio.Event()
+        self.unblocked.set()
+
+    async def ensure_open(self) -> None:
+        pass
+
+    def write_frame_sync(self, fin: bool, opcode: int, data: bytes) -> None:  # pylint: disable=unused-argument
+        self.sent.append(data.decode())
+
+    async def drain(self) -> None:
+        self.drains += 1
+        await self.unblocked.wait()
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:  # pylint: disable=unused-argument
+        self.close_code = code
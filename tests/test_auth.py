@@ -1,3 +1,4 @@
+import hashlib
 import http
 import importlib
 from unittest import mock
@@ -7,6 +8,7 @@ from conf import (
     VALID_AUTH_TOKEN,
     VALID_FLASK_SESSION_COOKIE,
 )
+from itsdangerous import URLSafeTimedSerializer
 from websockets import Headers
 
 import sigsvc.auth.handle as h
@@ -35,6 +37,64 @@ class TestAuth:
         res = await h.auth(Headers({}))
         assert res == (http.HTTPStatus.UNAUTHORIZED, [], b"Missing auth token\n")
 
+    async def test_auth_context(self):
+        ctx = h.AuthContext()
+        session_cookie = h.get_flask_signing_serializer().dumps({"_user_id": "42"})
+        cookie = f"_ga=1; {h.WS_CONN_ID_COOKIE_NAME}=1234; {h.FLASK_SESSION_COOKIE_NAME}={session_cookie}"
+        res = await h.auth(Headers({"cookie": cookie}), ctx)
+        assert res is None
+        assert ctx == h.AuthContext(authenticated=True, ws_conn_id="1234", user_id=42)
+
+    async def test_auth_context_not_authenticated(self):
+        ctx = h.AuthContext()
+        await h.auth(Headers({"cookie": f"{h.WS_CONN_ID_COOKIE_NAME}=1234; {h.AUTH_TOKEN_COOKIE_NAME}=dcba"}), ctx)
+        assert not ctx.authenticated
+
+    async def test_cookie_signed_by_flask(self):
+        # same signer setup as flask's SecureCookieSessionInterface
+        flask_serializer = URLSafeTimedSerializer(
+            h.FLASK_SECRET_KEY,
+            salt=h.FLASK_SIGN_SALT,
+            serializer=h.TaggedJSONSerializer(),
+            signer_kwargs={"key_derivation": "hmac", "digest_method": hashlib.sha1},
+        )
+        session_cookie = flask_serializer.dumps({"_user_id": "43"})
+        assert h.get_user_id(session_cookie) == 43
+        # and the other way round: comparing the cookies themselves is racy, they carry a timestamp (in seconds)
+        assert flask_serializer.loads(h.get_flask_signing_serializer().dumps({"_user_id": "43"})) == {"_user_id": "43"}
+
+    async def test_session_cookie_is_cached(self):
+        session_cookie = h.get_flask_signing_serializer().dumps({"_user_id": "42"})
+        assert h.get_user_id(session_cookie) == 42
+        with mock.patch.object(h, "get_flask_signing_serializer") as serializer:
+            assert h.get_user_id(session_cookie) == 42
+            serializer.assert_not_called()
+
+    async def test_session_cookie_verified_in_executor(self):
+        h._session_cache.clear()  # pylint: disable=protected-access
+        session_cookie = h.get_flask_signing_serializer().dumps({"_user_id": "44"})
+        assert await h.get_user_id_async(session_cookie) == 44
+        assert h.get_user_id(session_cookie) == 44  # cached by the async call
+        with pytest.raises(h.BadSignature):
+            await h.get_user_id_async(session_cookie[:-1])
+
+    async def test_expired_cache_entry_is_reverified(self):
+        h._session_cache.clear()  # pylint: disable=protected-access
+        session_cookie = h.get_flask_signing_serializer().dumps({"_user_id": "42"})
+        assert h.get_user_id(session_cookie) == 42
+        with mock.patch.object(h.time, "monotonic", return_value=h.time.monotonic() + h.SESSION_CACHE_TTL):
+            with mock.patch.object(h, "get_flask_signing_serializer") as serializer:
+                serializer.return_value.loads.side_effect = h.BadSignature("revoked")
+                with pytest.raises(h.BadSignature):
+                    h.get_user_id(session_cookie)
+        assert not h._session_cache  # pylint: disable=protected-access
+
+    async def test_invalid_sign_digest(self):
+        with mock.patch.dict("os.environ", {"FLASK_SIGN_DIGEST": "SHA256"}):
+            with pytest.raises(ValueError, match="FLASK_SIGN_DIGEST"):
+                importlib.reload(h)
+        importlib.reload(h)  # back to a fully initialized module
+
     @mock.patch.dict("os.environ", {"FLASK_PERMANENT_SESSION_LIFETIME": "1"})
     async def test_expired_session_cookie(self):
         importlib.reload(h)  # to re-apply os.environ
@@ -0,0 +1,31 @@
+from sigsvc.biz.cookie import find_cookies
+
+NAMES = frozenset(("session", "sigsvc_wsconnid"))
+
+
+class TestFindCookies:
+    def test_finds_requested_cookies_only(self):
+        res = find_cookies("_ga=GA1.1.123; session=.eJw.abc; theme=dark; sigsvc_wsconnid=1234", NAMES)
+        assert res == {"session": ".eJw.abc", "sigsvc_wsconnid": "1234"}
+
+    def test_missing_cookie(self):
+        assert find_cookies("_ga=GA1.1.123; theme=dark", NAMES) == {}
+
+    def test_quoted_value(self):
+        assert find_cookies('session="abc"', NAMES) == {"session": "abc"}
+
+    def test_escaped_value_falls_back_to_simplecookie(self):
+        assert find_cookies('session="a\\"b"; sigsvc_wsconnid=1', NAMES) == {"session": 'a"b', "sigsvc_wsconnid": "1"}
+
+    def test_first_duplicate_wins(self):
+        expected = {"session": "a", "sigsvc_wsconnid": "1"}
+        assert find_cookies("session=a; session=b; sigsvc_wsconnid=1", NAMES) == expected
+        assert find_cookies("session=a; sigsvc_wsconnid=1; session=b", NAMES) == expected
+        assert find_cookies("session=a; session=b", frozenset(("session",))) == {"session": "a"}
+
+    def test_first_duplicate_wins_in_fallback(self):
+        assert find_cookies('session="a\\"b"; session=c; sigsvc_wsconnid=1', NAMES) == {
+            "session": 'a"b',
+            "sigsvc_wsconnid": "1",
+        }
+        assert find_cookies('x="\\"; session=a; session=b', NAMES) == {"session": "a"}
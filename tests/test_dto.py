@@ -0,0 +1,27 @@
+import sigsvc.biz.dto as d
+
+
+class TestResponseTemplates:
+    def test_welcome_response(self):
+        peer_id = "a0cdd3f1-0ba4-4b05-9d71-c4b0b2ae3a1b"
+        assert d.welcome_response(peer_id) == d.get_schema(d.WelcomeResponseDTO).dumps(
+            d.WelcomeResponseDTO(peerId=peer_id)
+        )
+
+    def test_session_responses(self):
+        for session_id in ("421ba7f4", 'with "quotes" and \\'):
+            assert d.session_ended_response(session_id) == d.get_schema(d.EndSessionResponseDTO).dumps(
+                d.EndSessionResponseDTO(session_id=session_id)
+            )
+            assert d.session_created_response(session_id) == d.get_schema(d.CreateSessionResponseDTO).dumps(
+                d.CreateSessionResponseDTO(session_id=session_id)
+            )
+
+    def test_error_response(self):
+        for message in ("unknown peer", 'with "quotes"', {"code": 1409, "message": "sessionsvc error"}, None):
+            assert d.error_response(1409, message) == d.get_schema(d.ErrorResponseDTO).dumps(
+                d.ErrorResponseDTO(code=1409, message=message)
+            )
+
+    def test_empty_list_response(self):
+        assert d.EMPTY_LIST_RESPONSE == '{"type":"list","producers":[]}'
@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from unittest import mock
+
+import pytest
+from conf import FakeWebSocket
+
+from sigsvc.biz import peer as p
+from sigsvc.biz.peer import (
+    Peer,
+    new_peer_id,
+)
+
+
+class TestPeer:
+    def test_new_peer_id_is_canonical_uuid4(self):
+        for _ in range(100):
+            peer_id = new_peer_id()
+            u = uuid.UUID(peer_id)
+            assert str(u) == peer_id
+            assert u.version == 4
+            assert u.variant == uuid.RFC_4122
+
+    @pytest.mark.asyncio
+    async def test_send_nowait(self):
+        ws = FakeWebSocket()
+        peer = Peer.from_ws(ws)
+        await peer.send("0")
+        assert ws.sent == ["0"]
+        assert peer.out_queue.empty()
+        await peer.close()
+
+    @pytest.mark.asyncio
+    async def test_send_is_queued_if_direct_write_fails(self):
+        ws = FakeWebSocket()
+        peer = Peer.from_ws(ws)
+        ws.transport = None  # type: ignore
+        await peer.send("0")
+        assert not ws.sent
+        assert peer.out_queue.qsize() == 1
+        await peer.close()
+
+    @pytest.mark.asyncio
+    async def test_send_is_queued_while_buffer_is_full(self):
+        ws = FakeWebSocket()
+        ws.transport.buffer_size = 32768
+        peer = Peer.from_ws(ws)
+        for i in range(3):
+            await peer.send(str(i))
+        assert not ws.sent
+        await asyncio.sleep(0)
+        assert ws.sent == ["0", "1", "2"]
+        assert ws.drains == 1
+        await peer.close()
+
+    @pytest.mark.asyncio
+    async def test_slow_peer_is_disconnected(self):
+        ws = FakeWebSocket()
+        ws.transport.buffer_size = 65536
+        ws.unblocked.clear()
+        peer = Peer.from_ws(ws)
+        for i in range(p.OUT_QUEUE_MAX_SIZE + 2):
+            await peer.send(str(i))
+        await asyncio.sleep(0)
+        assert ws.close_code == p.OUT_QUEUE_OVERFLOW_CLOSE_CODE
+        await peer.send("dropped")
+        assert peer.out_queue.empty()  # the sender has taken the rest, it's waiting for the drain
+        assert "dropped" not in ws.sent
+        await peer.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_disconnect_is_logged(self, caplog):
+        ws = FakeWebSocket()
+        ws.transport.buffer_size = 65536
+        ws.unblocked.clear()
+        ws.close = mock.AsyncMock(side_effect=RuntimeError("boom"))  # type: ignore
+        peer = Peer.from_ws(ws)
+        for i in range(p.OUT_QUEUE_MAX_SIZE + 2):
+            await peer.send(str(i))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)  # done callbacks run on the next iteration
+        assert peer.closing.done()
+        assert "disconnect failed: boom" in caplog.text
+        peer.stop_sending()
+
+    @pytest.mark.asyncio
+    async def test_peer_is_disconnected_on_sender_failure(self):
+        ws = FakeWebSocket()
+        ws.transport.buffer_size = 65536
+        ws.write_frame_sync = mock.Mock(side_effect=RuntimeError("boom"))  # type: ignore
+        peer = Peer.from_ws(ws)
+        await peer.send("0")
+        await asyncio.sleep(0)
+        assert ws.close_code == p.SENDER_FAILURE_CLOSE_CODE
+        assert peer.sender.done()
+
+    def test_link_consumer(self):
+        producer, consumer = Peer(id="p", ws=FakeWebSocket(), ws_conn_id="1"), Peer(
+            id="c", ws=FakeWebSocket(), ws_conn_id="1"
+        )
+        producer.link_consumer(consumer)
+        assert producer.consumer_peer is consumer
+        assert consumer.producer_peer is producer
+        consumer.unlink()
+        assert producer.consumer_peer is None
+        assert consumer.producer_peer is None
+
+    def test_old_producer_close_keeps_new_link(self):
+        # resumed container: the new producer connects for the same consumer before the old connection gets closed
+        old, new, consumer = (Peer(id=i, ws=FakeWebSocket(), ws_conn_id="1") for i in ("p1", "p2", "c"))
+        old.link_consumer(consumer)
+        new.link_consumer(consumer)
+        assert old.consumer_peer is None
+        old.unlink()
+        assert consumer.producer_peer is new
+        assert new.consumer_peer is consumer
@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+from unittest import mock
+
+import pytest
+
+from sigsvc.biz.sessions_manager import SessionsManager
+from sigsvc.services import sessionsvc
+from sigsvc.services.dto.sessionsvc import (
+    GetSessionResponseDTO,
+    SessionDC,
+    SessionStatus,
+)
+
+
+def session_response(session_id: str) -> GetSessionResponseDTO:
+    return GetSessionResponseDTO(
+        session=SessionDC(
+            id=session_id,
+            app_release_uuid="421ba7f4",
+            container=None,
+            updated=datetime.datetime(2024, 1, 1),
+            user_id=1,
+            ws_conn=SessionDC.WsConn(id="1234", consumer_id="c", producer_id="p"),
+            status=SessionStatus.ACTIVE,
+        )
+    )
+
+
+async def slow_get_session(session_id: str) -> GetSessionResponseDTO:
+    await asyncio.sleep(0.01)
+    return session_response(session_id)
+
+
+@pytest.mark.asyncio
+class TestSessionsManager:
+    async def test_concurrent_get_session_single_request(self):
+        sm = SessionsManager()
+        with mock.patch.object(sessionsvc, "get_session", side_effect=slow_get_session) as get_session:
+            sessions = await asyncio.gather(*(sm.get_session("s1") for _ in range(10)))
+            assert await sm.get_session("s1") is sessions[0]
+        get_session.assert_called_once_with("s1")
+        assert all(s is sessions[0] for s in sessions)
+        assert not sm.inflight
+
+    async def test_invalidated_while_fetching(self):
+        sm = SessionsManager()
+        with mock.patch.object(sessionsvc, "get_session", side_effect=slow_get_session) as get_session:
+            stale = asyncio.create_task(sm.get_session("s1"))
+            await asyncio.sleep(0)
+            sm.invalidate_cache("s1")
+            assert (await stale).id == "s1"
+            assert "s1" not in sm.sessions_cache
+            await sm.get_session("s1")
+        assert get_session.call_count == 2
+
+    async def test_start_session_prefetches(self):
+        sm = SessionsManager()
+        with mock.patch.object(sessionsvc, "start_session") as start_session, mock.patch.object(
+            sessionsvc, "get_session", side_effect=slow_get_session
+        ) as get_session:
+            await sm.start_session("s1", "1234", "p", "c")
+            start_session.assert_awaited_once()
+            assert "s1" in sm.inflight
+            assert (await sm.get_session("s1")).id == "s1"
+        get_session.assert_called_once_with("s1")
+
+    async def test_get_session_during_start_session_is_not_cached(self):
+        sm = SessionsManager()
+        started = False
+
+        async def get_session(session_id: str) -> GetSessionResponseDTO:
+            res = session_response(session_id)
+            if not started:
+                res.session.ws_conn.producer_id = None
+            await asyncio.sleep(0.01)
+            return res
+
+        async def start_session(session_id: str, req) -> None:
+            nonlocal started
+            await asyncio.sleep(0.02)
+            started = True
+
+        with mock.patch.object(sessionsvc, "start_session", side_effect=start_session), mock.patch.object(
+            sessionsvc, "get_session", side_effect=get_session
+        ):
+            start = asyncio.create_task(sm.start_session("s1", "1234", "p", "c"))
+            await asyncio.sleep(0)
+            assert (await sm.get_session("s1")).ws_conn.producer_id is None
+            await start
+            assert (await sm.get_session("s1")).ws_conn.producer_id == "p"
@@ -0,0 +1,99 @@
+from unittest import mock
+
+import pytest
+from conf import FakeWebSocket
+
+from sigsvc.biz import webrtc
+from sigsvc.biz.dto import (
+    EMPTY_LIST_RESPONSE,
+    SetPeerStatusRequestDTO,
+)
+from sigsvc.biz.peer import (
+    Peer,
+    PeerRole,
+)
+
+
+@pytest.fixture
+def connect():
+    connected = []
+
+    def _connect() -> Peer:
+        peer = Peer.from_ws(FakeWebSocket())
+        webrtc.peers[peer.id] = peer
+        connected.append(peer)
+        return peer
+
+    yield _connect
+    for peer in connected:
+        peer.stop_sending()
+        webrtc.peers.pop(peer.id, None)
+
+
+async def set_producer(producer: Peer, consumer_id: str) -> None:
+    await webrtc.handle_set_peer_status(
+        producer, SetPeerStatusRequestDTO(roles=["producer"], meta={"consumerId": consumer_id})
+    )
+
+
+@pytest.mark.asyncio
+class TestList:
+    async def test_list_linked_producer(self, connect):
+        consumer, producer = connect(), connect()
+        await set_producer(producer, consumer.id)
+        assert consumer.producer_peer is producer
+        await webrtc.handle_list(consumer)
+        assert consumer.ws.sent[-1] == producer.list_response
+        assert producer.id in consumer.ws.sent[-1]
+
+    async def test_absent_consumer_is_not_linked(self, connect):
+        producer = connect()
+        await set_producer(producer, "absent")
+        assert producer.consumer_peer is None
+
+    async def test_empty_list_after_producer_disconnects(self, connect):
+        consumer, producer = connect(), connect()
+        await set_producer(producer, consumer.id)
+        await webrtc.handle_connection_closed(producer)
+        assert consumer.producer_peer is None
+        await webrtc.handle_list(consumer)
+        assert consumer.ws.sent[-1] == EMPTY_LIST_RESPONSE
+
+
+@pytest.mark.asyncio
+class TestConnectionClosed:
+    async def test_peer_without_sessions_skips_lookup(self, connect):
+        peer = connect()
+        peer.role = PeerRole.CONSUMER
+        with mock.patch.object(webrtc, "sessions_manager", autospec=True) as sm:
+            await webrtc.handle_connection_closed(peer)
+        sm.get_peer_sessions.assert_not_called()
+        assert peer.id not in webrtc.peers
+
+    async def test_peer_with_sessions_looks_them_up(self, connect):
+        peer = connect()
+        peer.role = PeerRole.CONSUMER
+        peer.has_sessions = True
+        with mock.patch.object(webrtc, "sessions_manager", autospec=True) as sm:
+            sm.get_peer_sessions.return_value = []
+            await webrtc.handle_connection_closed(peer)
+        sm.get_peer_sessions.assert_awaited_once_with(peer)
+
+    async def test_failing_session_end_does_not_stop_the_others(self, connect, caplog):
+        peer = connect()
+        peer.role = PeerRole.CONSUMER
+        peer.has_sessions = True
+        sessions = [mock.Mock(id=f"s{i}", ending=False, **{"other_peer_id.return_value": None}) for i in range(3)]
+
+        async def pause_session(session_id: str) -> None:
+            if session_id == "s1":
+                raise RuntimeError("sessionsvc is down")
+
+        with mock.patch.object(webrtc, "sessions_manager", autospec=True) as sm:
+            sm.get_peer_sessions.return_value = sessions
+            sm.get_session.side_effect = {s.id: s for s in sessions}.get
+            sm.pause_session.side_effect = pause_session
+            await webrtc.handle_connection_closed(peer)
+        assert sorted(c.kwargs["session_id"] for c in sm.pause_session.await_args_list) == ["s0", "s1", "s2"]
+        sm.close_session.assert_not_called()  # consumers' sessions are only paused
+        assert "failed to end session: s1" in caplog.text